@@ -163,11 +163,19 @@ else:
 
         st.divider()
 
+        # Latency of the last streamed response, recorded by the generators
+        if "last_stream_metrics" in st.session_state:
+            metrics = st.session_state.last_stream_metrics
+            cols_metrics = st.columns(2)
+            cols_metrics[0].metric("⏱️ TTFT", f"{metrics['ttft'] * 1000:.0f} ms")
+            cols_metrics[1].metric("Total", f"{metrics['total']:.1f} s")
+            st.divider()
+
         if doc_count > 0:
             st.success(f"✅ {doc_count} document(s) loaded")
             with st.expander("📄 View loaded documents", expanded=False):
-                for i, source in enumerate(st.session_state.rag_sources, 1):
-                    st.write(f"{i}. {source}")
+                # One markdown element for the whole list instead of one per source
+                st.markdown("\n".join(f"{i}. {source}" for i, source in enumerate(st.session_state.rag_sources, 1)))
         else:
             st.info("📭 No documents loaded yet")
 
@@ -211,7 +219,15 @@ else:
             messages = [HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"]) for m in st.session_state.messages]
 
             if not st.session_state.use_rag:
-                st.write_stream(stream_llm_response(llm_stream, messages))
+                response_stream = stream_llm_response(llm_stream, messages)
             else:
-                st.write_stream(stream_llm_rag_response(llm_stream, messages))
+                response_stream = stream_llm_rag_response(llm_stream, messages)
+
+            # Render the in-progress reply as plain text so each chunk skips
+            # markdown re-tokenization; parse markdown once when the stream ends
+            for chunk in response_stream:
+                full_response += chunk
+                message_placeholder.text(full_response)
+
+            message_placeholder.markdown(full_response)
             
\ No newline at end of file
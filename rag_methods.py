@@ -1,31 +1,50 @@
+import hashlib
+import io
 import os
 import dotenv
-from time import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from time import monotonic, time
+from uuid import uuid4
 import streamlit as st
-from pinecone import Pinecone, ServerlessSpec
-
-from langchain_community.document_loaders.text import TextLoader
-from langchain_community.document_loaders import (
-    WebBaseLoader,
-    PyPDFLoader,
-    Docx2txtLoader,
-)
+
+# Heavy dependencies (pinecone, langchain, pypdf, ...) are imported lazily
+# inside the functions that use them - Streamlit re-imports this module on
+# every script rerun, so top-level imports are paid on every keystroke.
 # pip install docx2txt, pypdf
-from langchain_pinecone import PineconeVectorStore
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, AzureOpenAIEmbeddings
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
 
 dotenv.load_dotenv()
 
 # os.environ["USER_AGENT"] = "myagent"
 DB_DOCS_LIMIT = 10
+MIN_CHUNK_CHARS = 50  # chunks shorter than this are never worth embedding
+EMBED_BATCH_SIZE = 256  # texts per embed_documents call
+EMBED_MAX_CONCURRENCY = 8  # embedding batches in flight at once
+UPSERT_BATCH_SIZE = 100  # vectors per Pinecone upsert request
+UPSERT_POOL_THREADS = 30  # parallel in-flight upsert requests
+STREAM_FLUSH_INTERVAL = 0.05  # seconds between streamed UI updates
+STREAM_FLUSH_CHARS = 64  # flush early once this much text is buffered
+
+def _delete_namespace(index, namespace):
+    """Delete all vectors in a namespace; runs in a background thread"""
+    try:
+        index.delete(delete_all=True, namespace=namespace)
+        print(f"Cleaned up current session namespace: {namespace}")
+    except Exception as e:
+        print(f"Error during session cleanup: {e}")
+        # Don't raise - cleanup is optional
+
 
 # Function to cleanup current session namespace
 def cleanup_current_session():
     """Delete vectors from current session namespace in Pinecone"""
+    # Nothing was ever loaded, so the namespace is empty - skip the round trip
+    if not st.session_state.get("rag_sources") and "vector_db" not in st.session_state:
+        return
+
     try:
         if "session_id" in st.session_state and st.session_state.session_id:
             pc = get_pinecone_client()
@@ -34,76 +53,191 @@ def cleanup_current_session():
 
             current_namespace = f"session-{st.session_state.session_id}"
 
-            # Delete all vectors in the current namespace
-            index.delete(delete_all=True, namespace=current_namespace)
-            print(f"Cleaned up current session namespace: {current_namespace}")
+            # Delete in the background so "Reset All" doesn't block the rerun
+            # on a Pinecone round trip
+            threading.Thread(
+                target=_delete_namespace,
+                args=(index, current_namespace),
+                daemon=True,
+            ).start()
 
-            # Clear session state
+            # Clear session state immediately
             if "vector_db" in st.session_state:
                 del st.session_state.vector_db
             if "rag_sources" in st.session_state:
                 st.session_state.rag_sources = []
 
+            # Cached chains point at the deleted vector store
+            _build_rag_chain.clear()
+
     except Exception as e:
         print(f"Error during session cleanup: {e}")
         # Don't raise - cleanup is optional
 
 
+def _record_stream_metrics(ttft, total_time, num_chunks):
+    """Store latency metrics from the last streamed response for the sidebar"""
+    if ttft is None:  # stream produced no chunks
+        return
+    st.session_state.setdefault("ttft_history", []).append(ttft)
+    st.session_state.last_stream_metrics = {
+        "ttft": ttft,
+        "total": total_time,
+        "per_chunk": (total_time - ttft) / max(num_chunks - 1, 1),
+    }
+
+
 # Function to stream the response of the LLM
 def stream_llm_response(llm_stream, messages):
-    response_message = ""
+    # Accumulate parts in a list and join once - O(n) instead of the O(n^2)
+    # of repeated string concatenation on long replies
+    parts = []
+    buffer = ""
+    first = True
+    t0 = monotonic()
+    first_token_time = None
+    last_flush = monotonic()
 
     for chunk in llm_stream.stream(messages):
-        response_message += chunk.content
-        yield chunk
+        text = chunk.content
+        parts.append(text)
+
+        # Forward the very first token immediately to preserve TTFT
+        if first:
+            first = False
+            first_token_time = monotonic() - t0
+            yield text
+            last_flush = monotonic()
+            continue
+
+        buffer += text
 
-    st.session_state.messages.append({"role": "assistant", "content": response_message})
+        # Coalesce token deltas into ~50 ms windows so Streamlit doesn't
+        # re-render the whole transcript on every single token
+        if monotonic() - last_flush > STREAM_FLUSH_INTERVAL or len(buffer) > STREAM_FLUSH_CHARS:
+            yield buffer
+            buffer = ""
+            last_flush = monotonic()
+
+    if buffer:
+        yield buffer
+
+    _record_stream_metrics(first_token_time, monotonic() - t0, len(parts))
+    st.session_state.messages.append({"role": "assistant", "content": "".join(parts)})
 
 
 # --- Indexing Phase ---
 
+def _load_single_doc(doc_file):
+    """Parse one uploaded file into documents with the matching loader"""
+    from langchain_core.documents import Document
+
+    if doc_file.type == "application/pdf":
+        import pypdf
+
+        # Parse the PDF straight from the upload buffer - no temp file round trip
+        reader = pypdf.PdfReader(io.BytesIO(doc_file.getbuffer()))
+        return [
+            Document(
+                page_content=page.extract_text() or "",
+                metadata={"source": doc_file.name, "page": page_number},
+            )
+            for page_number, page in enumerate(reader.pages)
+        ]
+
+    # Temp file per upload avoids filename collisions across worker threads
+    suffix = os.path.splitext(doc_file.name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as file:
+        # Stream in 1 MiB blocks instead of materializing the whole upload as bytes
+        shutil.copyfileobj(doc_file, file, length=1048576)
+        file_path = file.name
+
+    try:
+        if doc_file.name.endswith(".docx"):
+            from langchain_community.document_loaders import Docx2txtLoader
+
+            loader = Docx2txtLoader(file_path)
+        else:
+            from langchain_community.document_loaders.text import TextLoader
+
+            loader = TextLoader(file_path)
+
+        return loader.load()
+
+    finally:
+        os.remove(file_path)
+
+
 def load_doc_to_db():
     # Use loader according to doc type
     if "rag_docs" in st.session_state and st.session_state.rag_docs:
-        docs = []
-        loaded_files = []
+        # Pre-assign slots in the main thread so session state stays thread-safe
+        files_to_load = []
         for doc_file in st.session_state.rag_docs:
-            if doc_file.name not in st.session_state.rag_sources:
-                if len(st.session_state.rag_sources) < DB_DOCS_LIMIT:
-                    os.makedirs("source_files", exist_ok=True)
-                    file_path = f"./source_files/{doc_file.name}"
-                    with open(file_path, "wb") as file:
-                        file.write(doc_file.read())
-
-                    try:
-                        if doc_file.type == "application/pdf":
-                            loader = PyPDFLoader(file_path)
-                        elif doc_file.name.endswith(".docx"):
-                            loader = Docx2txtLoader(file_path)
-                        elif doc_file.type in ["text/plain", "text/markdown"]:
-                            loader = TextLoader(file_path)
-                        else:
-                            st.warning(f"Document type {doc_file.type} not supported.")
-                            continue
+            if doc_file.name in st.session_state.rag_sources:
+                continue
+
+            if len(st.session_state.rag_sources) + len(files_to_load) >= DB_DOCS_LIMIT:
+                st.error(F"Maximum number of documents reached ({DB_DOCS_LIMIT}).")
+                break
+
+            if doc_file.type == "application/pdf" or doc_file.name.endswith(".docx") \
+                    or doc_file.type in ["text/plain", "text/markdown"]:
+                files_to_load.append(doc_file)
+            else:
+                st.warning(f"Document type {doc_file.type} not supported.")
 
-                        docs.extend(loader.load())
-                        st.session_state.rag_sources.append(doc_file.name)
-                        loaded_files.append(doc_file.name)
+        if not files_to_load:
+            return
 
-                    except Exception as e:
-                        st.toast(f"Error loading document {doc_file.name}: {e}", icon="⚠️")
-                        print(f"Error loading document {doc_file.name}: {e}")
-                    
-                    finally:
-                        os.remove(file_path)
+        docs = []
+        loaded_files = []
+        # Overlap disk writes and PDF/DOCX parsing across files
+        with ThreadPoolExecutor(max_workers=min(8, len(files_to_load))) as executor:
+            futures = {executor.submit(_load_single_doc, doc_file): doc_file for doc_file in files_to_load}
+            for future in as_completed(futures):
+                doc_file = futures[future]
+                try:
+                    docs.extend(future.result())
+                    st.session_state.rag_sources.append(doc_file.name)
+                    loaded_files.append(doc_file.name)
 
-                else:
-                    st.error(F"Maximum number of documents reached ({DB_DOCS_LIMIT}).")
+                except Exception as e:
+                    st.toast(f"Error loading document {doc_file.name}: {e}", icon="⚠️")
+                    print(f"Error loading document {doc_file.name}: {e}")
 
         if docs and loaded_files:
             _split_and_load_docs(docs)
             st.toast(f"Document *{', '.join(loaded_files)}* loaded successfully.", icon="✅")
 
+# Shared keep-alive HTTP session for URL loads
+@st.cache_resource(show_spinner=False)
+def _get_web_session():
+    """Build a requests session reused across all web loads"""
+    import requests
+
+    return requests.Session()
+
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def _fetch_url_docs(url):
+    """Fetch and parse a URL's content, cached per URL for an hour"""
+    from langchain_community.document_loaders import WebBaseLoader
+
+    loader = WebBaseLoader(
+        [url],
+        requests_per_second=5,
+        continue_on_failure=True,
+    )
+    # Swap in the shared keep-alive session, keeping the headers the loader
+    # configured on its own session (User-Agent, Accept, ...) - replacing
+    # them with requests' defaults gets 403s from many sites
+    session = _get_web_session()
+    session.headers.update(loader.session.headers)
+    loader.session = session
+    return loader.load()
+
+
 def load_url_to_db():
     if "rag_url" in st.session_state and st.session_state.rag_url:
         url = st.session_state.rag_url
@@ -113,8 +247,7 @@ def load_url_to_db():
                 try:
                     with st.spinner(f"Loading content from {url}..."):
                         print(f"Loading URL: {url}")  # Debug log
-                        loader = WebBaseLoader(url)
-                        docs.extend(loader.load())
+                        docs.extend(_fetch_url_docs(url))
                         print(f"Loaded {len(docs)} documents from URL")  # Debug log
 
                     if docs and len(docs) > 0:
@@ -145,14 +278,68 @@ def load_url_to_db():
             st.info(f"URL already loaded: {url}")
 
 # Helper function to get Pinecone client
+@st.cache_resource(show_spinner=False)
 def get_pinecone_client():
-    """Initialize and return Pinecone client"""
+    """Initialize and return Pinecone client (cached once per process)"""
+    from pinecone import Pinecone
+
     api_key = os.getenv("PINECONE_API_KEY")
     if not api_key:
         raise ValueError("PINECONE_API_KEY not found in environment variables")
 
     return Pinecone(api_key=api_key)
 
+@st.cache_resource(show_spinner=False)
+def _build_embedding_model(provider, api_key):
+    """Build the embedding model for (provider, api_key), cached once per process
+
+    Caching here means the Azure deployment-name fallback probing below only
+    runs the first time, not on every upload/cleanup callback.
+    """
+    from langchain_openai import OpenAIEmbeddings, AzureOpenAIEmbeddings
+
+    if provider == "openai":
+        print(f"Using OpenAI API key: {api_key[:7]}...")  # Debug log
+        return OpenAIEmbeddings(api_key=api_key)
+
+    print("Using Azure OpenAI embeddings")  # Debug log
+    print(f"Azure endpoint: {os.getenv('AZ_OPENAI_ENDPOINT')}")
+    print(f"API version: 2024-02-15-preview")
+    try:
+        embedding = AzureOpenAIEmbeddings(
+            api_key=api_key,
+            azure_endpoint=os.getenv("AZ_OPENAI_ENDPOINT"),
+            azure_deployment="text-embedding-3-large",
+            openai_api_version="2024-02-15-preview",
+            dimensions=1024,  # Match Pinecone index dimension
+        )
+        print("Azure OpenAI embeddings initialized successfully (1024 dimensions)")
+    except Exception as embed_error:
+        print(f"Failed to initialize Azure embeddings: {embed_error}")
+        print("Trying alternative deployment names...")
+        # Try common alternative names
+        for deployment_name in ["text-embedding-3-large", "embedding", "embeddings", "text-embedding-ada-002"]:
+            try:
+                print(f"Trying deployment name: {deployment_name}")
+                # Set dimensions based on model
+                dims = 1024 if "3-large" in deployment_name else 1536
+                embedding = AzureOpenAIEmbeddings(
+                    api_key=api_key,
+                    azure_endpoint=os.getenv("AZ_OPENAI_ENDPOINT"),
+                    azure_deployment=deployment_name,
+                    openai_api_version="2024-02-15-preview",
+                    dimensions=dims,
+                )
+                print(f"Success with deployment name: {deployment_name} ({dims} dimensions)")
+                break
+            except Exception as e:
+                print(f"Failed with {deployment_name}: {str(e)[:100]}")
+                continue
+        else:
+            raise embed_error
+
+    return embedding
+
 # Helper function to get embedding model
 def get_embedding_model():
     """Initialize and return the appropriate embedding model"""
@@ -162,54 +349,59 @@ def get_embedding_model():
             if "openai_api_key" not in st.session_state or not st.session_state.openai_api_key:
                 raise ValueError("OpenAI API key not found in session state")
 
-            api_key = st.session_state.openai_api_key
-            print(f"Using OpenAI API key: {api_key[:7]}...")  # Debug log
-            embedding = OpenAIEmbeddings(api_key=api_key)
-        else:
-            print("Using Azure OpenAI embeddings")  # Debug log
-            print(f"Azure endpoint: {os.getenv('AZ_OPENAI_ENDPOINT')}")
-            print(f"API version: 2024-02-15-preview")
-            try:
-                embedding = AzureOpenAIEmbeddings(
-                    api_key=os.getenv("AZ_OPENAI_API_KEY"),
-                    azure_endpoint=os.getenv("AZ_OPENAI_ENDPOINT"),
-                    azure_deployment="text-embedding-3-large",
-                    openai_api_version="2024-02-15-preview",
-                    dimensions=1024,  # Match Pinecone index dimension
-                )
-                print("Azure OpenAI embeddings initialized successfully (1024 dimensions)")
-            except Exception as embed_error:
-                print(f"Failed to initialize Azure embeddings: {embed_error}")
-                print("Trying alternative deployment names...")
-                # Try common alternative names
-                for deployment_name in ["text-embedding-3-large", "embedding", "embeddings", "text-embedding-ada-002"]:
-                    try:
-                        print(f"Trying deployment name: {deployment_name}")
-                        # Set dimensions based on model
-                        dims = 1024 if "3-large" in deployment_name else 1536
-                        embedding = AzureOpenAIEmbeddings(
-                            api_key=os.getenv("AZ_OPENAI_API_KEY"),
-                            azure_endpoint=os.getenv("AZ_OPENAI_ENDPOINT"),
-                            azure_deployment=deployment_name,
-                            openai_api_version="2024-02-15-preview",
-                            dimensions=dims,
-                        )
-                        print(f"Success with deployment name: {deployment_name} ({dims} dimensions)")
-                        break
-                    except Exception as e:
-                        print(f"Failed with {deployment_name}: {str(e)[:100]}")
-                        continue
-                else:
-                    raise embed_error
-
-        return embedding
+            return _build_embedding_model("openai", st.session_state.openai_api_key)
+
+        return _build_embedding_model("azure", os.getenv("AZ_OPENAI_API_KEY"))
     except Exception as e:
         print(f"Error in embedding initialization: {e}")
         raise e
 
+def _batched(iterable, batch_size):
+    """Yield successive batches of at most batch_size items from iterable"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def _embed_and_upsert(document_chunks, embedding, index_name, namespace):
+    """Embed chunks in large batches and upsert them to Pinecone in parallel"""
+    # Nothing to do, and ThreadPoolExecutor rejects max_workers=0
+    if not document_chunks:
+        return
+
+    pc = get_pinecone_client()
+    index = pc.Index(index_name, pool_threads=UPSERT_POOL_THREADS)
+
+    # Embed the 256-text batches concurrently to amortize per-request overhead
+    batches = list(_batched(document_chunks, EMBED_BATCH_SIZE))
+    with ThreadPoolExecutor(max_workers=min(EMBED_MAX_CONCURRENCY, len(batches))) as executor:
+        batch_embeddings = list(executor.map(
+            lambda batch: embedding.embed_documents([chunk.page_content for chunk in batch]),
+            batches,
+        ))
+
+    vectors = []
+    for batch, embeddings in zip(batches, batch_embeddings):
+        for chunk, vector in zip(batch, embeddings):
+            metadata = dict(chunk.metadata)
+            metadata["text"] = chunk.page_content  # text_key used by PineconeVectorStore on retrieval
+            vectors.append((str(uuid4()), vector, metadata))
+
+    # Fire all upsert batches without waiting, then collect the results
+    async_results = [
+        index.upsert(vectors=batch, namespace=namespace, async_req=True)
+        for batch in _batched(vectors, UPSERT_BATCH_SIZE)
+    ]
+    [result.get() for result in async_results]
+
+    print(f"✅ Upserted {len(vectors)} vectors to Pinecone namespace: {namespace}")
+
+
 # Embedding - Initialize Pinecone Vector Store
 def initialize_vector_db(docs):
     """Initialize Pinecone vector store with documents"""
+    from langchain_pinecone import PineconeVectorStore
+
     try:
         # Get embedding model
         embedding = get_embedding_model()
@@ -221,11 +413,13 @@ def initialize_vector_db(docs):
         print(f"Initializing Pinecone vector DB with {len(docs)} documents")
         print(f"Index: {index_name}, Namespace: {namespace}")
 
-        # Initialize Pinecone vector store
-        vector_db = PineconeVectorStore.from_documents(
-            documents=docs,
-            embedding=embedding,
+        # Embed in large batches and upsert in parallel instead of letting
+        # PineconeVectorStore.from_documents send chunks one small group at a time
+        _embed_and_upsert(docs, embedding, index_name, namespace)
+
+        vector_db = PineconeVectorStore.from_existing_index(
             index_name=index_name,
+            embedding=embedding,
             namespace=namespace,
         )
 
@@ -239,6 +433,8 @@ def initialize_vector_db(docs):
 
 def _split_and_load_docs(docs):
     """Split documents and load them into Pinecone"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
     # Log original document stats
     total_chars = sum(len(doc.page_content) for doc in docs)
     print(f"\n{'='*60}")
@@ -246,31 +442,62 @@ def _split_and_load_docs(docs):
     print(f"Total characters: {total_chars:,}")
     print(f"{'='*60}\n")
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=5000,
-        chunk_overlap=1000,
+    # Token-based splitting runs in tiktoken's native tokenizer instead of
+    # walking the string character-by-character in Python
+    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name="cl100k_base",
+        chunk_size=1000,
+        chunk_overlap=200,
     )
 
     document_chunks = text_splitter.split_documents(docs)
 
+    # Drop whitespace-only/near-empty chunks (common on scanned PDFs and
+    # tables) and exact duplicates, so they never cost an embedding call or
+    # a Pinecone vector
+    seen_hashes = set()
+    kept_chunks = []
+    for chunk in document_chunks:
+        content = chunk.page_content.strip()
+        content_hash = hashlib.md5(content.encode()).hexdigest()
+        if len(content) < MIN_CHUNK_CHARS or content_hash in seen_hashes:
+            continue
+        seen_hashes.add(content_hash)
+        kept_chunks.append(chunk)
+
+    if len(kept_chunks) < len(document_chunks):
+        print(f"🧹 Filtered out {len(document_chunks) - len(kept_chunks)} empty/duplicate chunks")
+    document_chunks = kept_chunks
+
+    # Tiny notes or scanned PDFs can leave nothing worth embedding
+    if not document_chunks:
+        st.warning("No usable content found in the document(s) after filtering.")
+        print("⚠️ No chunks survived filtering - skipping Pinecone load")
+        return
+
     print(f"✅ Created {len(document_chunks)} chunks from {len(docs)} documents")
     print(f"   Average chunk size: {total_chars // max(len(document_chunks), 1):,} characters")
 
     if "vector_db" not in st.session_state:
         st.session_state.vector_db = initialize_vector_db(document_chunks)
     else:
-        # Add documents to existing Pinecone namespace
+        # Add documents to existing Pinecone namespace through the same
+        # batched parallel upsert path used on first load, instead of the
+        # serial add_documents wrapper
+        embedding = get_embedding_model()
         index_name = os.getenv("PINECONE_INDEX_NAME", "document-rag-vectors")
         namespace = f"session-{st.session_state['session_id']}"
 
-        # Use the existing vector store to add new documents
-        st.session_state.vector_db.add_documents(document_chunks)
+        _embed_and_upsert(document_chunks, embedding, index_name, namespace)
         print(f"✅ Added {len(document_chunks)} chunks to Pinecone namespace: {namespace}")
 
 
 # Retrival Phase
 
 def _get_context_retriever_chain(vector_db, llm):
+    from langchain.chains import create_history_aware_retriever
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
     # Configure retriever to return more results
     retriever = vector_db.as_retriever(
         search_type="similarity",
@@ -289,8 +516,19 @@ def _get_context_retriever_chain(vector_db, llm):
     return retriever_chain
 
 
-def get_conversational_rag_chain(llm):
-    retriever_chain = _get_context_retriever_chain(st.session_state.vector_db, llm)
+@st.cache_resource(show_spinner=False)
+def _build_rag_chain(vector_db_id, model_name, _llm):
+    """Assemble the retrieval chain once per (vector store, model) pair
+
+    vector_db_id and model_name are the cache key; the llm itself is passed
+    unhashed (leading underscore) since a fresh but equivalent instance is
+    built on every rerun.
+    """
+    from langchain.chains import create_retrieval_chain
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+    retriever_chain = _get_context_retriever_chain(st.session_state.vector_db, _llm)
 
     prompt = ChatPromptTemplate.from_messages([
         ("system",
@@ -301,36 +539,66 @@ def get_conversational_rag_chain(llm):
         MessagesPlaceholder(variable_name="messages"),
         ("user", "{input}"),
     ])
-    stuff_documents_chain = create_stuff_documents_chain(llm, prompt)
+    stuff_documents_chain = create_stuff_documents_chain(_llm, prompt)
 
     return create_retrieval_chain(retriever_chain, stuff_documents_chain)
 
 
+def get_conversational_rag_chain(llm):
+    return _build_rag_chain(id(st.session_state.vector_db), st.session_state.model, llm)
+
+
 def stream_llm_rag_response(llm_stream, messages):
     print(f"\n{'='*60}")
     print(f"🤖 RAG Query: {messages[-1].content}")
     print(f"{'='*60}\n")
 
     conversation_rag_chain = get_conversational_rag_chain(llm_stream)
-    response_message = "*(RAG Response)*\n"
-
-    # Debug: Try to see what's being retrieved
-    try:
-        # Get the retriever for debugging
-        retriever = st.session_state.vector_db.as_retriever(search_kwargs={"k": 5})
-        docs_retrieved = retriever.get_relevant_documents(messages[-1].content)
-        print(f"📄 Retrieved {len(docs_retrieved)} documents:")
-        for i, doc in enumerate(docs_retrieved, 1):
-            preview = doc.page_content[:200].replace('\n', ' ')
-            print(f"   {i}. {preview}...")
-    except Exception as e:
-        print(f"⚠️  Debug retrieval failed: {e}")
+    parts = ["*(RAG Response)*\n"]
+
+    # Debug: Try to see what's being retrieved. Opt-in only - this duplicates
+    # the chain's own retrieval (an extra embedding call + Pinecone query)
+    if os.getenv("RAG_DEBUG"):
+        try:
+            # Get the retriever for debugging
+            retriever = st.session_state.vector_db.as_retriever(search_kwargs={"k": 5})
+            docs_retrieved = retriever.get_relevant_documents(messages[-1].content)
+            print(f"📄 Retrieved {len(docs_retrieved)} documents:")
+            for i, doc in enumerate(docs_retrieved, 1):
+                preview = doc.page_content[:200].replace('\n', ' ')
+                print(f"   {i}. {preview}...")
+        except Exception as e:
+            print(f"⚠️  Debug retrieval failed: {e}")
+
+    buffer = ""
+    first = True
+    t0 = monotonic()
+    first_token_time = None
+    last_flush = monotonic()
 
     for chunk in conversation_rag_chain.pick("answer").stream({"messages": messages[:-1], "input": messages[-1].content}):
-        response_message += chunk
-        yield chunk
+        parts.append(chunk)
+
+        # Forward the very first token immediately to preserve TTFT
+        if first:
+            first = False
+            first_token_time = monotonic() - t0
+            yield chunk
+            last_flush = monotonic()
+            continue
+
+        buffer += chunk
+
+        if monotonic() - last_flush > STREAM_FLUSH_INTERVAL or len(buffer) > STREAM_FLUSH_CHARS:
+            yield buffer
+            buffer = ""
+            last_flush = monotonic()
+
+    if buffer:
+        yield buffer
 
-    st.session_state.messages.append({"role": "assistant", "content": response_message})
+    _record_stream_metrics(first_token_time, monotonic() - t0, len(parts) - 1)
+    st.session_state.messages.append({"role": "assistant", "content": "".join(parts)})
 
 
 